@@ -1,8 +1,14 @@
+import re
+import glob
+import time
 import platform
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from typing import List
 
+logger = logging.getLogger(__name__)
+
 # --- Library Imports ---
 try:
     import screeninfo
@@ -13,9 +19,11 @@ except ImportError as e:
     exit()
 
 # --- Data Structures for Devices ---
-# Using dataclasses provides structure and type safety.
+# Using dataclasses provides structure and type safety. slots skips the
+# per-instance __dict__ (these are rebuilt on every enumeration) and frozen
+# makes them hashable, so UI diffing can treat them as set members.
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Monitor:
     id: int
     name: str
@@ -23,7 +31,7 @@ class Monitor:
     position: tuple[int, int]
     is_primary: bool
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class AudioDevice:
     id: str  # The ID used by the soundcard library
     name: str
@@ -31,7 +39,7 @@ class AudioDevice:
     is_loopback: bool = False
     is_default: bool = False
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Webcam:
     id: int  # The index used by OpenCV
     name: str
@@ -50,12 +58,54 @@ class BaseDeviceDetector:
     def detect_webcams(self) -> List[Webcam]:
         raise NotImplementedError
 
+    def invalidate(self, category=None):
+        """Drops any cached detection results. A no-op for uncached detectors."""
+        pass
+
 # --- Default Concrete Implementation ---
 
 class DefaultDeviceDetector(BaseDeviceDetector):
     """A default device detector that uses cross-platform libraries."""
 
+    # How long (in seconds) cached enumeration results remain valid.
+    # Full enumeration (especially the webcam probe) can take hundreds of
+    # milliseconds, so repeat calls within this window reuse the last result.
+    CACHE_TTL = 5.0
+
+    def __init__(self):
+        # Maps category name ('monitors', 'audio', 'webcams') to (timestamp, result).
+        self._cache = {}
+
+    def invalidate(self, category=None):
+        """
+        Drops cached enumeration results so the next detect call re-enumerates.
+        Called when the OS reports a device change (hotplug). If category is
+        None, all categories are invalidated.
+        """
+        if category is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(category, None)
+
+    def _cached(self, category, detect_func):
+        """Returns a cached result for the category, re-detecting if stale."""
+        entry = self._cache.get(category)
+        if entry is not None and time.monotonic() - entry[0] < self.CACHE_TTL:
+            return entry[1]
+        result = detect_func()
+        self._cache[category] = (time.monotonic(), result)
+        return result
+
     def detect_monitors(self) -> List[Monitor]:
+        return self._cached('monitors', self._detect_monitors)
+
+    def detect_audio_devices(self) -> List[AudioDevice]:
+        return self._cached('audio', self._detect_audio_devices)
+
+    def detect_webcams(self) -> List[Webcam]:
+        return self._cached('webcams', self._detect_webcams)
+
+    def _detect_monitors(self) -> List[Monitor]:
         monitors = []
         try:
             for i, m in enumerate(screeninfo.get_monitors()):
@@ -67,52 +117,120 @@ class DefaultDeviceDetector(BaseDeviceDetector):
                     is_primary=m.is_primary
                 ))
         except screeninfo.common.ScreenInfoError as e:
-            logging.error(f"Could not detect monitors: {e}")
+            logger.error(f"Could not detect monitors: {e}")
         return monitors
 
-    def detect_audio_devices(self) -> List[AudioDevice]:
+    def _detect_audio_devices(self) -> List[AudioDevice]:
         devices = []
+        # Outputs (Speakers/Headphones)
         try:
-            # Outputs (Speakers/Headphones)
-            default_speaker = sc.default_speaker()
+            # Resolve the default device once; on Windows each default_*
+            # call re-enumerates WASAPI endpoints.
+            default_speaker_id = sc.default_speaker().id
             for dev in sc.all_speakers():
-                devices.append(AudioDevice(
-                    id=dev.id,
-                    name=f"[Output] {dev.name}",
-                    is_input=False,
-                    is_default=(dev.id == default_speaker.id)
-                ))
-            
-            # Inputs (Microphones)
-            default_mic = sc.default_microphone()
+                try:
+                    # Bind the properties once — each access can be a COM
+                    # property fetch on Windows.
+                    dev_id, dev_name = dev.id, dev.name
+                    devices.append(AudioDevice(
+                        id=dev_id,
+                        name=f"[Output] {dev_name}",
+                        is_input=False,
+                        is_default=(dev_id == default_speaker_id)
+                    ))
+                except Exception as e:
+                    logger.error("Skipping an output device that failed to enumerate: %s", e)
+        except Exception as e:
+            logger.error(f"Could not detect output audio devices: {e}")
+
+        # Inputs (Microphones)
+        try:
+            default_mic_id = sc.default_microphone().id
             for dev in sc.all_microphones(include_loopback=True):
-                devices.append(AudioDevice(
-                    id=dev.id,
-                    name=f"[Input] {dev.name}",
-                    is_input=True,
-                    is_loopback=dev.isloopback,
-                    is_default=(dev.id == default_mic.id)
-                ))
+                try:
+                    dev_id, dev_name = dev.id, dev.name
+                    devices.append(AudioDevice(
+                        id=dev_id,
+                        name=f"[Input] {dev_name}",
+                        is_input=True,
+                        is_loopback=getattr(dev, 'isloopback', False),
+                        is_default=(dev_id == default_mic_id)
+                    ))
+                except Exception as e:
+                    logger.error("Skipping an input device that failed to enumerate: %s", e)
         except Exception as e:
-            logging.error(f"Could not detect audio devices: {e}")
+            logger.error(f"Could not detect input audio devices: {e}")
         return devices
         
-    def detect_webcams(self) -> List[Webcam]:
-        webcams = []
+    # Number of device indices to probe when looking for webcams.
+    MAX_WEBCAM_PROBES = 10
+
+    def _friendly_webcam_name(self, index: int) -> str:
+        """
+        Returns the camera's human-readable name where the OS exposes one
+        without opening the device (sysfs on Linux), falling back to a
+        generic label elsewhere.
+        """
+        if platform.system() == "Linux":
+            try:
+                with open(f'/sys/class/video4linux/video{index}/name') as f:
+                    name = f.read().strip()
+                if name:
+                    return name
+            except OSError:
+                pass
+        return f"Webcam {index}"
+
+    def _probe_webcam(self, index: int, api_preference) -> Webcam:
+        """Probes a single camera index. Returns a Webcam or None if absent."""
+        try:
+            cap = cv2.VideoCapture(index, api_preference)
+            if not cap.isOpened():
+                return None
+            # Keep the driver's frame queue shallow so the probe doesn't wait
+            # for a multi-frame buffer to fill.
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            # Querying a capability is enough to tell an available camera from
+            # a present-but-busy one. Actually reading a frame would force the
+            # driver to start streaming, which costs hundreds of ms per device.
+            width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+            status = "Active" if width > 0 else "Present (in use or initializing)"
+            cap.release()
+            return Webcam(id=index, name=self._friendly_webcam_name(index), status=status)
+        except Exception as e:
+            logger.error("Error while probing webcam index %s: %s", index, e)
+            return None
+
+    def _enumerate_video_indices(self) -> List[int]:
+        """
+        Returns the camera indices worth probing. On Linux the real device
+        nodes are listed from /dev/video*, which avoids wasted VideoCapture
+        probes for indices that don't exist (and handles indices above the
+        blind-probe limit). Other platforms fall back to a fixed range.
+        """
+        if platform.system() == "Linux":
+            indices = []
+            for node in glob.glob('/dev/video*'):
+                match = re.search(r'(\d+)$', node)
+                if match:
+                    indices.append(int(match.group(1)))
+            return sorted(indices)
+        return list(range(self.MAX_WEBCAM_PROBES))
+
+    def _detect_webcams(self) -> List[Webcam]:
         api_preference = cv2.CAP_ANY
         if platform.system() == "Windows":
             api_preference = cv2.CAP_DSHOW
 
-        for i in range(10):
-            cap = cv2.VideoCapture(i, api_preference)
-            if cap.isOpened():
-                ret, frame = cap.read()
-                status = "Active" if ret else "Present (in use or initializing)"
-                webcams.append(Webcam(id=i, name=f"Webcam {i}", status=status))
-                cap.release()
-            else:
-                break
-        return webcams
+        indices = self._enumerate_video_indices()
+        if not indices:
+            return []
+
+        # Each VideoCapture init can block for hundreds of ms on driver I/O,
+        # so all indices are probed in parallel instead of sequentially.
+        with ThreadPoolExecutor(max_workers=max(len(indices), 1)) as executor:
+            results = executor.map(lambda i: self._probe_webcam(i, api_preference), indices)
+        return [webcam for webcam in results if webcam is not None]
 
 # --- Factory Function ---
 
@@ -1,15 +1,45 @@
-import io
 import os
 import time
+import signal
+import socket
 import logging
+import platform
+import collections
 import psutil
 import qdarkstyle
-from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QGroupBox, QCheckBox, QLabel, QRadioButton, QButtonGroup, QMessageBox, QDialog, QTextEdit)
-from PyQt6.QtCore import QThread, pyqtSignal, Qt, QRect, QPoint
-from PyQt6.QtGui import QPainter, QColor, QPen, QFont, QGuiApplication, QTextCursor
+from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QGroupBox, QCheckBox, QLabel, QRadioButton, QButtonGroup, QMessageBox, QDialog, QPlainTextEdit)
+from PyQt6.QtCore import QThread, pyqtSignal, Qt, QRect, QPoint, QTimer, QSocketNotifier, QFileSystemWatcher, QAbstractNativeEventFilter, QCoreApplication, QSignalBlocker
+from PyQt6.QtGui import QPainter, QColor, QPen, QFont, QGuiApplication, QTextCursor, QPixmap
 from device_manager import get_device_detector, Monitor, AudioDevice, Webcam
 from recorder import Recorder
 
+def _free_disk_bytes(path: str) -> int:
+    """Returns free disk space in bytes for the filesystem holding path."""
+    if platform.system() == "Windows":
+        import ctypes
+        free = ctypes.c_ulonglong(0)
+        ok = ctypes.windll.kernel32.GetDiskFreeSpaceExW(
+            ctypes.c_wchar_p(path), ctypes.byref(free), None, None)
+        if not ok:
+            # On failure the out-param stays 0, which would read as a full
+            # disk. Fall back to psutil rather than report a false alarm.
+            return psutil.disk_usage(path).free
+        return free.value
+    stats = os.statvfs(path)
+    return stats.f_bavail * stats.f_frsize
+
+def _available_ram_bytes() -> int:
+    """Returns available RAM in bytes, reading /proc/meminfo directly on Linux."""
+    if platform.system() == "Linux":
+        try:
+            with open('/proc/meminfo') as f:
+                for line in f:
+                    if line.startswith('MemAvailable:'):
+                        return int(line.split()[1]) * 1024
+        except (OSError, ValueError, IndexError):
+            pass
+    return psutil.virtual_memory().available
+
 def adjust_rect_for_ffmpeg(rect: QRect) -> QRect:
     """Ensures the width and height of a QRect are even numbers."""
     x, y, w, h = rect.x(), rect.y(), rect.width(), rect.height()
@@ -29,41 +59,96 @@ class SelectionOverlay(QWidget):
         self.setGeometry(QGuiApplication.primaryScreen().virtualGeometry())
         self.begin = None
         self.end = None
-        
+        # The translucent dim layer is rendered once into a pixmap. Repaints
+        # blit the four strips around the selection instead of alpha-filling
+        # the whole virtual desktop and punching a hole per repaint.
+        self._dim = QPixmap(self.size())
+        self._dim.fill(QColor(0, 0, 0, 100))
+        self._last_selection_rect = QRect()
+        # High-polling-rate mice deliver move events faster than the
+        # compositor consumes repaints; coalesce them to ~60 Hz.
+        self._update_timer = QTimer(self)
+        self._update_timer.setSingleShot(True)
+        self._update_timer.setInterval(16)
+        self._update_timer.timeout.connect(self._do_update)
+
     def paintEvent(self, event):
         if self.begin is None or self.end is None:
             return
 
         painter = QPainter(self)
-        painter.fillRect(self.rect(), QColor(0, 0, 0, 100))
-        
         selection_rect = QRect(self.begin, self.end).normalized()
-        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Clear)
-        painter.fillRect(selection_rect, Qt.GlobalColor.transparent)
-        
-        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceOver)
+        full = self.rect()
+
+        # Blit the dim layer in four strips around the selection, leaving
+        # the selection interior fully transparent.
+        strips = (
+            QRect(0, 0, full.width(), selection_rect.top()),
+            QRect(0, selection_rect.bottom() + 1, full.width(), full.height() - selection_rect.bottom() - 1),
+            QRect(0, selection_rect.top(), selection_rect.left(), selection_rect.height()),
+            QRect(selection_rect.right() + 1, selection_rect.top(), full.width() - selection_rect.right() - 1, selection_rect.height()),
+        )
+        for strip in strips:
+            strip = strip.intersected(event.rect())
+            if not strip.isEmpty():
+                painter.drawPixmap(strip, self._dim, strip)
+
         painter.setPen(QPen(QColor(50, 200, 50), 2, Qt.PenStyle.SolidLine))
         painter.drawRect(selection_rect)
-        
+
         painter.setFont(QFont("Arial", 12, QFont.Weight.Bold))
         painter.setPen(QColor("white"))
         text = f"{selection_rect.width()} x {selection_rect.height()}"
         painter.drawText(selection_rect.bottomLeft() + QPoint(5, 20), text)
 
+    def _dirty_rect(self) -> QRect:
+        """Union of the previous and current selection, padded for the border and text."""
+        current = QRect(self.begin, self.end).normalized()
+        dirty = current.united(self._last_selection_rect).adjusted(-3, -3, 3, 25)
+        # The size label can be wider than a narrow selection; extend the
+        # region so stale text below the rect is repainted too.
+        dirty.setRight(max(dirty.right(), current.left() + 130))
+        return dirty
+
+    def showEvent(self, event):
+        # The overlay outlives monitor hotplugs and resolution changes:
+        # re-track the current virtual desktop (and resize the cached dim
+        # layer) before each selection, or a reused overlay would cover
+        # the geometry from whenever it was first built.
+        geometry = QGuiApplication.primaryScreen().virtualGeometry()
+        if geometry != self.geometry():
+            self.setGeometry(geometry)
+        if self._dim.size() != self.size():
+            self._dim = QPixmap(self.size())
+            self._dim.fill(QColor(0, 0, 0, 100))
+        super().showEvent(event)
+
     def mousePressEvent(self, event):
         self.begin = event.pos()
         self.end = event.pos()
+        self._last_selection_rect = QRect(self.begin, self.end).normalized()
         self.update()
 
     def mouseMoveEvent(self, event):
         self.end = event.pos()
-        self.update()
+        # Defer the repaint: further moves within the interval are coalesced
+        # into a single update when the timer fires.
+        if not self._update_timer.isActive():
+            self._update_timer.start()
+
+    def _do_update(self):
+        if self.begin is None or self.end is None:
+            return
+        # Repaint only the region that changed, not the whole overlay
+        self.update(self._dirty_rect())
+        self._last_selection_rect = QRect(self.begin, self.end).normalized()
 
     def mouseReleaseEvent(self, event):
+        # Hide rather than close, so the overlay can be shown again without
+        # paying window creation and translucency setup on every selection.
         self.hide()
         selection_rect = QRect(self.begin, self.end).normalized()
         self.area_selected.emit(selection_rect)
-        self.close()
 
 class LogViewerDialog(QDialog):
     """A simple dialog to display real-time logs."""
@@ -73,102 +158,73 @@ class LogViewerDialog(QDialog):
         self.setGeometry(150, 150, 700, 400)
         
         layout = QVBoxLayout(self)
-        self.log_display = QTextEdit()
+        # QPlainTextEdit appends in amortized O(1) regardless of document
+        # length, unlike QTextEdit whose rich-text layout cost grows with
+        # total content.
+        self.log_display = QPlainTextEdit()
         self.log_display.setReadOnly(True)
         self.log_display.setFont(QFont("Courier", 9))
         self.log_display.setStyleSheet("background-color: #1e1e1e; color: #d4d4d4;")
-        
+
+        # Drop the oldest blocks once the document grows large, so memory
+        # stays bounded during long recording sessions.
+        self.log_display.setMaximumBlockCount(5000)
+
         layout.addWidget(self.log_display)
         self.setModal(False) # Allow interaction with main window
 
+        # Incoming lines are buffered and flushed in batches. FFmpeg can emit
+        # hundreds of lines per second and a QTextDocument relayout per line
+        # would saturate the GUI thread.
+        self._pending = collections.deque(maxlen=5000)
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setInterval(100) # Flush at ~10 Hz
+        self._flush_timer.timeout.connect(self._flush)
+        self._flush_timer.start()
+
     def append_log(self, text):
-        """Appends a line of text to the log display."""
+        """Queues a piece of text for display on the next flush."""
+        self._pending.append(text)
+
+    def _flush(self):
+        """Appends all pending text to the display in a single insert."""
+        if not self._pending:
+            return
+        text = ''.join(self._pending)
+        self._pending.clear()
         self.log_display.moveCursor(QTextCursor.MoveOperation.End)
         self.log_display.insertPlainText(text)
         self.log_display.moveCursor(QTextCursor.MoveOperation.End)
 
-class LogReaderThread(QThread):
-    """Reads a stream (stdout/stderr) from a process and emits lines as signals."""
-    log_line_received = pyqtSignal(str)
-    
-    def __init__(self, stream):
-        super().__init__()
-        self.stream = stream
-        self.running = True
+class DeviceDetectionThread(QThread):
+    """Runs the (potentially slow) device enumeration off the UI thread."""
+    devices_ready = pyqtSignal(list, list, list)  # monitors, audio_devices, webcams
 
-    def run(self):
-        # Use io.TextIOWrapper to handle decoding and newlines correctly
-        with io.TextIOWrapper(self.stream, encoding="utf-8", errors='ignore') as text_stream:
-            while self.running and not text_stream.closed:
-                try:
-                    line = text_stream.readline()
-                    if line:
-                        self.log_line_received.emit(line)
-                    else:
-                        break # End of stream
-                except Exception:
-                    break
-
-    def stop(self):
-        self.running = False
-
-class ProcessMonitorThread(QThread):
-    """Monitors running processes and reports their status."""
-    process_status_update = pyqtSignal(int, str) # pid, status ('running', 'exited_ok', 'exited_error')
-
-    def __init__(self, processes):
+    def __init__(self, detector):
         super().__init__()
-        self.processes = processes
-        self.running = True
+        self.detector = detector
 
     def run(self):
-        while self.running:
-            for process, task_name in self.processes:
-                if process.poll() is None:
-                    # Process is still running
-                    self.process_status_update.emit(process.pid, "running")
-                else:
-                    # Process has exited
-                    status = "exited_ok" if process.returncode == 0 else "exited_error"
-                    self.process_status_update.emit(process.pid, status)
-            self.msleep(2000) # Check every 2 seconds
-
-    def stop(self):
-        self.running = False
+        monitors = self.detector.detect_monitors()
+        audio_devices = self.detector.detect_audio_devices()
+        webcams = self.detector.detect_webcams()
+        self.devices_ready.emit(monitors, audio_devices, webcams)
 
-class ResourceMonitorThread(QThread):
-    """Monitors disk space and RAM, emitting a warning if they are low."""
-    low_resource_warning = pyqtSignal(str)
+class DeviceChangeEventFilter(QAbstractNativeEventFilter):
+    """Listens for WM_DEVICECHANGE on Windows and reports device changes."""
+    WM_DEVICECHANGE = 0x0219
 
-    def __init__(self, path_to_monitor, ram_threshold_gb=0.5, disk_threshold_gb=1.0):
+    def __init__(self, on_change):
         super().__init__()
-        self.running = True
-        self.path = path_to_monitor
-        self.ram_threshold = ram_threshold_gb * (1024**3)
-        self.disk_threshold = disk_threshold_gb * (1024**3)
-        self.disk_warning_sent = False
-        self.ram_warning_sent = False
+        self.on_change = on_change
 
-    def run(self):
-        while self.running:
-            # Check Disk Space
-            if not self.disk_warning_sent:
-                disk_usage = psutil.disk_usage(self.path)
-                if disk_usage.free < self.disk_threshold:
-                    self.low_resource_warning.emit(f"Disk space is critically low! Only {disk_usage.free / (1024**3):.2f} GB remaining.")
-                    self.disk_warning_sent = True # Only warn once
-            
-            # Check RAM
-            if not self.ram_warning_sent:
-                ram = psutil.virtual_memory()
-                if ram.available < self.ram_threshold:
-                    self.low_resource_warning.emit(f"Available RAM is critically low! Only {ram.available / (1024**3):.2f} GB remaining.")
-                    self.ram_warning_sent = True # Only warn once
-            
-            self.msleep(30000) # Check every 30 seconds
-
-    def stop(self):
-        self.running = False        
+    def nativeEventFilter(self, event_type, message):
+        if event_type == b"windows_generic_MSG":
+            import ctypes.wintypes
+            msg = ctypes.wintypes.MSG.from_address(int(message))
+            if msg.message == self.WM_DEVICECHANGE:
+                self.on_change()
+        return False, 0
 
 class MainWindow(QMainWindow):
     """The main application window."""
@@ -181,41 +237,147 @@ class MainWindow(QMainWindow):
         self.setGeometry(0, 0, 350, 400) #x,y,width,height
         self.setStyleSheet(qdarkstyle.load_stylesheet(qt_api='pyqt6'))
 
+        # Resolve the record-button icons once; standardIcon re-renders
+        # through the platform theme on every call.
+        style = self.style()
+        self._icon_play = style.standardIcon(style.StandardPixmap.SP_MediaPlay)
+        self._icon_stop = style.standardIcon(style.StandardPixmap.SP_MediaStop)
+
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
         self.main_layout = QVBoxLayout(self.central_widget)
         self.main_layout.setContentsMargins(5, 5, 5, 5)
         self.main_layout.setSpacing(5)
-        self.resource_monitor_thread = None
+        # Periodic checks run as QTimers on the GUI thread: two timers replace
+        # what used to be two dedicated polling threads, so status updates no
+        # longer need cross-thread signal marshalling. On POSIX the process
+        # check is additionally event-driven via SIGCHLD (see below), so the
+        # process timer only runs on Windows.
+        self._proc_timer = QTimer(self)
+        self._proc_timer.setInterval(2000)
+        self._proc_timer.timeout.connect(self._poll_processes)
+        self._sigchld_notifier = None
+        if platform.system() != "Windows":
+            self._install_sigchld_notifier()
+        self._res_timer = QTimer(self)
+        self._res_timer.setInterval(30000)
+        self._res_timer.timeout.connect(self._check_resources)
+        self._ram_threshold = 0.5 * (1024**3)
+        self._disk_threshold = 1.0 * (1024**3)
+        self._ram_warning_sent = False
+        self._disk_warning_sent = False
         self.app_log_viewer = LogViewerDialog(self)
         self.app_log_viewer.setWindowTitle("Application Logs")
         # --- Connect the new signal to the viewer's slot ---
-        self.app_log_signal.connect(self.app_log_viewer.append_log)        
+        self.app_log_signal.connect(self.app_log_viewer.append_log)
+        # The application log streams straight to disk while recording, so
+        # stopping never has to serialize the QTextDocument back out.
+        self._app_log_fp = None
+        self.app_log_signal.connect(self._write_app_log)
         self.ffmpeg_log_viewer = LogViewerDialog(self)
         self.ffmpeg_log_viewer.setWindowTitle("FFmpeg Terminal Output")
-        self.log_reader_threads = []
-        self.process_monitor_thread = None
-        self.pid_to_widget_map = {}     
+        # FFmpeg output is tailed from the per-task log files the Recorder
+        # writes; maps log path -> bytes already shown.
+        self._tail_positions = {}
+        self._tail_timer = QTimer(self)
+        self._tail_timer.setInterval(200)
+        self._tail_timer.timeout.connect(self._tail_ffmpeg_logs)
+        self.pid_to_widget_map = {}
+        # Maps a recorder task name (e.g. "Screen 0", "Audio Mic") to its
+        # status label. Populated as widgets are created, so build_pid_map
+        # doesn't have to re-derive it on every recording start.
+        self._task_name_to_widget = {}
 
         self.detector = get_device_detector()
         self.monitors, self.audio_devices, self.webcams = [], [], []
-        self.ui_widgets = {'monitors': {}, 'audio': [], 'webcams': []}
+        self._monitors_by_id = {}
+        self.ui_widgets = {'monitors': {}, 'audio': {}, 'webcams': {}}
+        # Tuple-of-ids fingerprint of the last device set shown. Tuples
+        # compare element-wise in C, with no string formatting needed.
+        self._device_fingerprint = None
+        self.selection_overlay = None
         self.recording_area = None
         self.is_recording = False
         self.recorder = None
 
+        self._setup_hotplug_invalidation()
+
         self._create_ui_sections()
-        self.update_ui_with_devices(*self._get_current_devices())
+        self._show_detection_placeholders()
+        # Run detection in a worker thread so the window paints immediately
+        # instead of blocking on webcam/audio enumeration.
+        self.detection_thread = None
+        self.refresh_devices()
+
+    def _show_detection_placeholders(self):
+        """Shows temporary labels while device detection runs in the background."""
+        self._placeholder_labels = []
+        for layout in (self.monitor_layout, self.audio_layout, self.webcam_layout):
+            label = QLabel("Detecting devices…")
+            self._placeholder_labels.append(label)
+            layout.addWidget(label)
+
+    def _remove_placeholders(self):
+        for label in self._placeholder_labels:
+            label.deleteLater()
+        self._placeholder_labels = []
+
+    def refresh_devices(self):
+        """Re-enumerates devices in the background and updates the UI."""
+        if self.is_recording:
+            return # Don't rebuild the device list mid-recording
+        if self.detection_thread and self.detection_thread.isRunning():
+            return # A detection pass is already in flight
+        self.detection_thread = DeviceDetectionThread(self.detector)
+        self.detection_thread.devices_ready.connect(self.update_ui_with_devices)
+        self.detection_thread.start()
+
+    def _on_device_change(self, *args):
+        """Handles an OS device-change notification (hotplug)."""
+        self.detector.invalidate()
+        # Restarting the timer on every event coalesces notification bursts
+        # (a USB hub reconnect fires many in a few ms) into one refresh.
+        self._refresh_timer.start()
+
+    def _setup_hotplug_invalidation(self):
+        """
+        Reacts to OS device-change notifications: the enumeration cache is
+        invalidated and the device list is refreshed. Event-driven, so idle
+        CPU stays at zero and hotplug shows up without a polling delay.
+        """
+        self.device_change_filter = None
+        self.device_watcher = None
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(250)
+        self._refresh_timer.timeout.connect(self.refresh_devices)
+        system = platform.system()
+        if system == "Windows":
+            self.device_change_filter = DeviceChangeEventFilter(self._on_device_change)
+            QCoreApplication.instance().installNativeEventFilter(self.device_change_filter)
+        elif system == "Linux":
+            # New webcams appear as /dev/video* nodes and new sound cards
+            # show up under /proc/asound, so watching the parent directories
+            # catches hotplug events.
+            self.device_watcher = QFileSystemWatcher(self)
+            for path in ('/dev', '/proc/asound'):
+                if os.path.isdir(path):
+                    self.device_watcher.addPath(path)
+            self.device_watcher.directoryChanged.connect(self._on_device_change)
+        else:
+            # No native change notification on this platform (e.g. macOS):
+            # fall back to a periodic rescan. The timer lives on the main
+            # thread and merely schedules the background detection pass —
+            # no dedicated polling thread, and the tuple fingerprint keeps
+            # unchanged scans from touching the UI.
+            self._rescan_timer = QTimer(self)
+            self._rescan_timer.setInterval(5000)
+            self._rescan_timer.timeout.connect(self._on_device_change)
+            self._rescan_timer.start()
 
     def _get_current_devices(self):
         return self.detector.detect_monitors(), self.detector.detect_audio_devices(), self.detector.detect_webcams()
 
-    def _clear_layout(self, layout):
-        while layout.count():
-            child = layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
-
     def _create_ui_sections(self):
         self.monitor_group_box = QGroupBox("Screen Capture")
         self.monitor_layout = QVBoxLayout()
@@ -238,7 +400,7 @@ class MainWindow(QMainWindow):
         
         self.record_button = QPushButton(" Record")
         self.record_button.setFixedHeight(40)
-        self.record_button.setIcon(self.style().standardIcon(getattr(self.style().StandardPixmap, "SP_MediaPlay")))
+        self.record_button.setIcon(self._icon_play)
         self.record_button.clicked.connect(self.toggle_recording)
 
         action_layout.addWidget(app_logs_button)
@@ -254,34 +416,71 @@ class MainWindow(QMainWindow):
 
 
     def update_ui_with_devices(self, monitors, audio_devices, webcams):
-        self.monitors, self.audio_devices, self.webcams = monitors, audio_devices, webcams
-        
-        self._clear_layout(self.monitor_layout)
-        self.ui_widgets['monitors'] = {}
-        for monitor in self.monitors:
-            self._add_monitor_widget(monitor)
+        # The device dataclasses are frozen with field-wise equality, so
+        # this catches label-affecting changes (a webcam's status, a
+        # monitor's resolution) as well as additions and removals.
+        current_fingerprint = (tuple(monitors), tuple(audio_devices), tuple(webcams))
+        if current_fingerprint == self._device_fingerprint:
+            return # Same devices as last time; nothing to rebuild
+        self._device_fingerprint = current_fingerprint
 
-        self._clear_layout(self.audio_layout)
-        self.ui_widgets['audio'] = []
-        for device in self.audio_devices:
-            self._add_audio_widget(device)
+        self.monitors, self.audio_devices, self.webcams = monitors, audio_devices, webcams
+        # Indexed once per device change so later lookups are O(1) instead
+        # of a linear scan per checked box.
+        self._monitors_by_id = {m.id: m for m in monitors}
 
-        self._clear_layout(self.webcam_layout)
-        self.ui_widgets['webcams'] = []
-        for device in self.webcams:
-            self._add_webcam_widget(device)
+        # Suspend painting while the sections change, so Qt performs one
+        # geometry/paint pass at the end instead of one per touched widget.
+        self.central_widget.setUpdatesEnabled(False)
+        try:
+            self._remove_placeholders()
+            # Devices rarely change, so each section is diffed against what
+            # is already on screen: only added/removed devices cost widget
+            # construction, and user selections on kept rows survive.
+            self._diff_section(self.ui_widgets['monitors'], monitors, self._add_monitor_widget,
+                               lambda m: f"Screen {m.id}: {m.resolution[0]}x{m.resolution[1]}")
+            self._diff_section(self.ui_widgets['audio'], audio_devices, self._add_audio_widget,
+                               lambda d: d.name)
+            self._diff_section(self.ui_widgets['webcams'], webcams, self._add_webcam_widget,
+                               lambda d: f"{d.name} ({d.status})")
+        finally:
+            self.central_widget.setUpdatesEnabled(True)
+
+    def _diff_section(self, rows, new_devices, add_func, display_func):
+        """Adds, removes and relabels one section's rows to match new_devices."""
+        new_ids = {device.id for device in new_devices}
+        for dev_id in list(rows):
+            if dev_id not in new_ids:
+                row = rows.pop(dev_id)
+                self._task_name_to_widget.pop(row['task_name'], None)
+                row['container'].deleteLater()
+        for device in new_devices:
+            row = rows.get(device.id)
+            if row is None:
+                add_func(device)
+            else:
+                row['device'] = device
+                text = display_func(device)
+                if row['checkbox'].text() != text:
+                    row['checkbox'].setText(text)
 
     def _add_monitor_widget(self, monitor):
-        # --- FIX: Correctly defined the layout hierarchy for the monitor widget ---
-        # A vertical layout for the entire monitor entry
-        entry_layout = QVBoxLayout()
+        # The entire entry is built on an unparented container widget and
+        # added to the live group layout in a single addWidget call.
+        entry_widget = QWidget()
+        entry_layout = QVBoxLayout(entry_widget)
+        entry_layout.setContentsMargins(0, 0, 0, 0)
         entry_layout.setSpacing(2)
 
         # A horizontal layout for the top line (status icon + checkbox)
         top_line_layout = QHBoxLayout()
         status_label = QLabel("⚪")
         checkbox = QCheckBox(f"Screen {monitor.id}: {monitor.resolution[0]}x{monitor.resolution[1]}")
-        checkbox.setChecked(monitor.is_primary)
+        # Block signals while setting the initial state; nothing is wired to
+        # this checkbox yet, so firing toggled would just queue dead slot
+        # calls during a refresh with many devices.
+        with QSignalBlocker(checkbox):
+            checkbox.setChecked(monitor.is_primary)
         top_line_layout.addWidget(status_label)
         top_line_layout.addWidget(checkbox)
         top_line_layout.addStretch()
@@ -292,7 +491,8 @@ class MainWindow(QMainWindow):
         options_layout.setContentsMargins(20, 0, 0, 0) # Indent options
         
         rb_fullscreen = QRadioButton("Fullscreen")
-        rb_fullscreen.setChecked(True)
+        with QSignalBlocker(rb_fullscreen):
+            rb_fullscreen.setChecked(True)
         rb_area = QRadioButton("Select Area")
         btn_select_area = QPushButton("Select rectangle")
         btn_select_area.setVisible(False) # Hide initially
@@ -312,50 +512,72 @@ class MainWindow(QMainWindow):
         
         # Store all widget references
         self.ui_widgets['monitors'][monitor.id] = {
-            'checkbox': checkbox, 'rb_fullscreen': rb_fullscreen, 'rb_area': rb_area, 
-            'label': lbl_area_dims, 'area_geo': None, 'status_label': status_label
+            'checkbox': checkbox, 'rb_fullscreen': rb_fullscreen, 'rb_area': rb_area,
+            'label': lbl_area_dims, 'area_geo': None, 'status_label': status_label,
+            'container': entry_widget, 'device': monitor, 'task_name': f"Screen {monitor.id}"
         }
+        self._task_name_to_widget[f"Screen {monitor.id}"] = status_label
 
         # Add the created layouts to the main entry layout
         entry_layout.addLayout(top_line_layout)
         entry_layout.addWidget(options_widget)
-        
+
         # Add the complete entry to the screen capture group box
-        self.monitor_layout.addLayout(entry_layout)         
+        self.monitor_layout.addWidget(entry_widget)
 
     def _add_audio_widget(self, device):
-        # FIX: Removed commented-out old code for clarity
-        widget_layout = QHBoxLayout()
+        row_widget = QWidget()
+        widget_layout = QHBoxLayout(row_widget)
+        widget_layout.setContentsMargins(0, 0, 0, 0)
         status_label = QLabel("⚪")
         checkbox = QCheckBox(device.name)
         if device.is_default or device.is_loopback:
-            checkbox.setChecked(True)
+            with QSignalBlocker(checkbox):
+                checkbox.setChecked(True)
         widget_layout.addWidget(status_label)
         widget_layout.addWidget(checkbox)
         widget_layout.addStretch()
-        
-        self.ui_widgets['audio'].append({'checkbox': checkbox, 'device': device, 'status_label': status_label})
-        self.audio_layout.addLayout(widget_layout)
+
+        self.ui_widgets['audio'][device.id] = {
+            'checkbox': checkbox, 'device': device, 'status_label': status_label,
+            'container': row_widget, 'task_name': f"Audio {device.name}"
+        }
+        self._task_name_to_widget[f"Audio {device.name}"] = status_label
+        self.audio_layout.addWidget(row_widget)
 
     def _add_webcam_widget(self, device):
-        # FIX: Removed commented-out old code for clarity
-        widget_layout = QHBoxLayout()
+        row_widget = QWidget()
+        widget_layout = QHBoxLayout(row_widget)
+        widget_layout.setContentsMargins(0, 0, 0, 0)
         status_label = QLabel("⚪")
         checkbox = QCheckBox(f"{device.name} ({device.status})")
         if device.status == "Active":
-            checkbox.setChecked(True)
+            with QSignalBlocker(checkbox):
+                checkbox.setChecked(True)
         widget_layout.addWidget(status_label)
         widget_layout.addWidget(checkbox)
         widget_layout.addStretch()
-        
-        self.ui_widgets['webcams'].append({'checkbox': checkbox, 'device': device, 'status_label': status_label})
-        self.webcam_layout.addLayout(widget_layout)
+
+        self.ui_widgets['webcams'][device.id] = {
+            'checkbox': checkbox, 'device': device, 'status_label': status_label,
+            'container': row_widget, 'task_name': f"Webcam {device.name}"
+        }
+        self._task_name_to_widget[f"Webcam {device.name}"] = status_label
+        self.webcam_layout.addWidget(row_widget)
 
     def select_area(self, monitor_id):
         self.active_selection_monitor_id = monitor_id
-        self.selection_overlay = SelectionOverlay()
-        self.selection_overlay.area_selected.connect(self.on_area_selected)
+        # The overlay is created lazily on first use and then reused;
+        # building a full-virtual-desktop translucent window takes hundreds
+        # of ms on some compositors.
+        if self.selection_overlay is None:
+            self.selection_overlay = SelectionOverlay()
+            self.selection_overlay.area_selected.connect(self.on_area_selected)
+        self.selection_overlay.begin = None
+        self.selection_overlay.end = None
+        self.selection_overlay._last_selection_rect = QRect()
         self.selection_overlay.show()
+        self.selection_overlay.raise_()
 
     def on_area_selected(self, rect: QRect):
         adjusted_rect = adjust_rect_for_ffmpeg(rect)
@@ -369,16 +591,14 @@ class MainWindow(QMainWindow):
     def toggle_recording(self):
         if self.is_recording:
             if self.recorder: self.recorder.stop()
-            for thread in self.log_reader_threads:
-                thread.stop()
-            if self.resource_monitor_thread: self.resource_monitor_thread.stop()
-            self.save_logs_to_file()                
-            self.log_reader_threads = []            
+            self._tail_timer.stop()
+            self._tail_ffmpeg_logs() # Pick up anything written during shutdown
+            self._proc_timer.stop()
+            self._res_timer.stop()
+            self.save_logs_to_file()
             self.set_ui_state(recording=False)
-            if self.process_monitor_thread: self.process_monitor_thread.stop()
             self.reset_status_indicators()
-            self.set_ui_state(recording=False) 
-            self.global_pids.clear() # Clear the global list on a clean stop           
+            self.global_pids.clear() # Clear the global list on a clean stop
         else:
             settings = self.gather_recording_settings()
             if not settings: return
@@ -393,77 +613,147 @@ class MainWindow(QMainWindow):
 
             active_processes = self.recorder.get_active_processes()
             if active_processes:
+                self._open_log_files()
                 # --- Populate the global PID set ---
                 for process, task_name in active_processes:
                     self.global_pids.add(process.pid)                
                 self.build_pid_map(active_processes)
-                self.start_log_readers(active_processes)
-                                
-                self.process_monitor_thread = ProcessMonitorThread(active_processes)
-                self.process_monitor_thread.process_status_update.connect(self.on_process_status_update)
-                self.process_monitor_thread.start()
-                
-                # Start resource monitoring
-                self.resource_monitor_thread = ResourceMonitorThread(self.recorder.project_dir)
-                self.resource_monitor_thread.low_resource_warning.connect(self.show_low_resource_warning)
-                self.resource_monitor_thread.start()
-                
+                self._start_log_tailing()
+
+                # On POSIX, SIGCHLD drives exit detection; Windows polls.
+                if platform.system() == "Windows":
+                    self._proc_timer.start()
+                self._poll_processes() # Paint the initial 'running' indicators
+                self._ram_warning_sent = False
+                self._disk_warning_sent = False
+                self._res_timer.start()
+
                 self.set_ui_state(recording=True)
             else:
                 QMessageBox.critical(self, "Recording Failed", "Could not start any recording processes. Please check App Logs for errors.")
                 self.reset_status_indicators()
 
-    def start_log_readers(self, processes):
-        for process, task_name in processes:
-            for stream in [process.stdout, process.stderr]:
-                thread = LogReaderThread(stream)
-                thread.log_line_received.connect(self.ffmpeg_log_viewer.append_log)
-                thread.start()
-                self.log_reader_threads.append(thread)
+    def _start_log_tailing(self):
+        """Begins tailing the Recorder's per-task FFmpeg log files."""
+        self._tail_positions = {path: 0 for path in self.recorder.get_log_paths()}
+        self._tail_timer.start()
+
+    def _tail_ffmpeg_logs(self):
+        """Reads newly appended bytes from each task log into the viewer."""
+        for path, position in list(self._tail_positions.items()):
+            try:
+                with open(path, 'rb') as f:
+                    f.seek(position)
+                    data = f.read()
+            except OSError:
+                continue # File not created yet, or already removed
+            if data:
+                self._tail_positions[path] = position + len(data)
+                self.ffmpeg_log_viewer.append_log(data.decode('utf-8', 'ignore'))
+
+    def _open_log_files(self):
+        """Opens the session application log that receives text as it arrives."""
+        try:
+            self._app_log_fp = open(os.path.join(self.recorder.project_dir, "application.log"), "a", buffering=1, encoding="utf-8")
+        except OSError as e:
+            logging.error(f"Could not open the application log for writing: {e}")
+
+    def _write_app_log(self, text):
+        if self._app_log_fp:
+            try:
+                self._app_log_fp.write(text)
+            except (OSError, ValueError):
+                pass
+
+    def _install_sigchld_notifier(self):
+        """
+        Makes child-process exits surface immediately on POSIX: SIGCHLD
+        wakes a socket pair which a QSocketNotifier turns into a status
+        check, so a crashed FFmpeg shows red without a 2-second poll delay.
+        """
+        self._sigchld_rsock, self._sigchld_wsock = socket.socketpair()
+        self._sigchld_rsock.setblocking(False)
+        self._sigchld_wsock.setblocking(False)
+        signal.set_wakeup_fd(self._sigchld_wsock.fileno())
+        # The handler body is empty — set_wakeup_fd writes the signal number
+        # to the socket, which is what wakes the notifier below.
+        signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+        self._sigchld_notifier = QSocketNotifier(self._sigchld_rsock.fileno(), QSocketNotifier.Type.Read, self)
+        self._sigchld_notifier.activated.connect(self._on_sigchld)
+
+    def _on_sigchld(self):
+        try:
+            self._sigchld_rsock.recv(4096) # Drain the wakeup bytes
+        except (BlockingIOError, InterruptedError):
+            pass
+        # Popen objects reap their own children via poll(); re-checking the
+        # tracked processes is all that's needed here.
+        self._poll_processes()
+
+    def _poll_processes(self):
+        """Checks each recording process and updates its status indicator."""
+        if not self.recorder:
+            return
+        for process, task_name in self.recorder.get_active_processes():
+            if process.poll() is None:
+                status = "running"
+            else:
+                status = "exited_ok" if process.returncode == 0 else "exited_error"
+            self.on_process_status_update(process.pid, status)
+
+    def _check_resources(self):
+        """Warns (once each) if disk space or available RAM runs low."""
+        if not self._disk_warning_sent and self.recorder:
+            free = _free_disk_bytes(self.recorder.project_dir)
+            if free < self._disk_threshold:
+                self.show_low_resource_warning(f"Disk space is critically low! Only {free / (1024**3):.2f} GB remaining.")
+                self._disk_warning_sent = True # Only warn once
+
+        if not self._ram_warning_sent:
+            available = _available_ram_bytes()
+            if available < self._ram_threshold:
+                self.show_low_resource_warning(f"Available RAM is critically low! Only {available / (1024**3):.2f} GB remaining.")
+                self._ram_warning_sent = True # Only warn once
 
     def show_low_resource_warning(self, message):
         """Shows a non-blocking warning message about low system resources."""
         QMessageBox.warning(self, "System Resource Warning", message)
 
     def save_logs_to_file(self):
-        """Saves the content of the log viewers to files in the project directory."""
-        if not self.recorder or not self.recorder.project_dir or not os.path.exists(self.recorder.project_dir):
-            return
-        
-        try:
-            app_log_content = self.app_log_viewer.log_display.toPlainText()
-            ffmpeg_log_content = self.ffmpeg_log_viewer.log_display.toPlainText()
-
-            with open(os.path.join(self.recorder.project_dir, "application.log"), "w", encoding="utf-8") as f:
-                f.write(app_log_content)
-            
-            with open(os.path.join(self.recorder.project_dir, "ffmpeg_output.log"), "w", encoding="utf-8") as f:
-                f.write(ffmpeg_log_content)
-            
-            logging.info("Log files saved successfully.")
-        except Exception as e:
-            logging.error(f"Could not save log files: {e}")
+        """
+        Finalizes the session log files. Content is streamed to disk as it
+        arrives during recording, so this only flushes and closes — stop
+        latency no longer depends on how much was logged.
+        """
+        for attr in ('_app_log_fp',):
+            fp = getattr(self, attr)
+            if fp:
+                setattr(self, attr, None)
+                try:
+                    fp.flush()
+                    fp.close()
+                except OSError as e:
+                    logging.error(f"Could not finalize log file: {e}")
+        logging.info("Log files saved successfully.")
 
     def build_pid_map(self, processes):
-        """Creates a map from process PID to the corresponding UI status label."""
+        """Creates a map from process PID to the corresponding UI status labels."""
+        # The task-name lookup table is maintained incrementally as widgets
+        # are created, so this is just a per-process dict build. A fused
+        # process records several screens under one composite task_name, so
+        # each PID maps to the labels of every constituent task.
         self.pid_to_widget_map = {}
-        task_name_to_widget = {}
-        # Create a lookup table from task name to widget
-        for monitor_id, widgets in self.ui_widgets['monitors'].items():
-            task_name_to_widget[f"Screen {monitor_id}"] = widgets['status_label']
-        for widget_set in self.ui_widgets['audio'] + self.ui_widgets['webcams']:
-            task_name_to_widget[f"Audio {widget_set['device'].name}"] = widget_set['status_label']
-            task_name_to_widget[f"Webcam {widget_set['device'].name}"] = widget_set['status_label']
-        
-        # Map PID to widget using the lookup table
         for process, task_name in processes:
-            if task_name in task_name_to_widget:
-                self.pid_to_widget_map[process.pid] = task_name_to_widget[task_name]
+            names = (self.recorder.get_subtask_names(task_name)
+                     if self.recorder else [task_name])
+            labels = [self._task_name_to_widget[name]
+                      for name in names if name in self._task_name_to_widget]
+            if labels:
+                self.pid_to_widget_map[process.pid] = labels
 
     def on_process_status_update(self, pid, status):
         """Updates the status indicator icon based on process status."""
-        if pid in self.pid_to_widget_map:
-            label = self.pid_to_widget_map[pid]
+        for label in self.pid_to_widget_map.get(pid, ()):
             if status == "running":
                 label.setText("<font color='green'>●</font>") # Green circle
             elif status == "exited_error":
@@ -477,7 +767,7 @@ class MainWindow(QMainWindow):
         """Resets all status icons to the default grey circle."""
         for widgets in self.ui_widgets['monitors'].values():
             widgets['status_label'].setText("⚪")
-        for widget_set in self.ui_widgets['audio'] + self.ui_widgets['webcams']:
+        for widget_set in list(self.ui_widgets['audio'].values()) + list(self.ui_widgets['webcams'].values()):
             widget_set['status_label'].setText("⚪")
 
     def set_status_for_selected(self, status):
@@ -486,7 +776,7 @@ class MainWindow(QMainWindow):
             text = "<font color='orange'>●</font>" # Orange circle
             for monitor_id, widgets in self.ui_widgets['monitors'].items():
                 if widgets['checkbox'].isChecked(): widgets['status_label'].setText(text)
-            for widget_set in self.ui_widgets['audio'] + self.ui_widgets['webcams']:
+            for widget_set in list(self.ui_widgets['audio'].values()) + list(self.ui_widgets['webcams'].values()):
                 if widget_set['checkbox'].isChecked(): widget_set['status_label'].setText(text)
 
     def set_ui_state(self, recording: bool):
@@ -496,17 +786,20 @@ class MainWindow(QMainWindow):
         self.webcam_group_box.setEnabled(not recording)
         if recording:
             self.record_button.setText(" Stop")
-            self.record_button.setIcon(self.style().standardIcon(getattr(self.style().StandardPixmap, "SP_MediaStop")))
+            self.record_button.setIcon(self._icon_stop)
         else:
             self.record_button.setText(" Record")
-            self.record_button.setIcon(self.style().standardIcon(getattr(self.style().StandardPixmap, "SP_MediaPlay")))
+            self.record_button.setIcon(self._icon_play)
 
     def gather_recording_settings(self) -> dict:
         screen_tasks, webcam_tasks, audio_tasks = [], [], []
 
         for monitor_id, widgets in self.ui_widgets['monitors'].items():
             if widgets['checkbox'].isChecked():
-                task = {'monitor': next(m for m in self.monitors if m.id == monitor_id)}
+                monitor = self._monitors_by_id.get(monitor_id)
+                if monitor is None:
+                    continue # Monitor vanished since the UI was last built
+                task = {'monitor': monitor}
                 if widgets['rb_area'].isChecked():
                     if not widgets['area_geo']:
                         QMessageBox.warning(self, "Area Not Selected", f"Please select an area for Screen {monitor_id}.")
@@ -517,32 +810,32 @@ class MainWindow(QMainWindow):
                     task['mode'] = 'fullscreen'
                 screen_tasks.append(task)
         
-        for widget_set in self.ui_widgets['audio']:
+        for widget_set in self.ui_widgets['audio'].values():
             if widget_set['checkbox'].isChecked(): audio_tasks.append(widget_set['device'])
-        
-        for widget_set in self.ui_widgets['webcams']:
+
+        for widget_set in self.ui_widgets['webcams'].values():
             if widget_set['checkbox'].isChecked(): webcam_tasks.append(widget_set['device'])
 
         if not screen_tasks and not webcam_tasks and not audio_tasks:
             QMessageBox.warning(self, "No Sources Selected", "Please select at least one screen, webcam, or audio source to record.")
             return None
             
-        return {"screen_tasks": screen_tasks, "webcam_tasks": webcam_tasks, "audio_tasks": audio_tasks}
-
-    def _clear_layout(self, layout):
-        while layout.count():
-            child = layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
-    
+        # save_path is part of Recorder's signature; None means its default
+        # (~/Videos). A future save-location picker only has to fill it in.
+        return {"screen_tasks": screen_tasks, "webcam_tasks": webcam_tasks,
+                "audio_tasks": audio_tasks, "save_path": None}
+
     def closeEvent(self, event):
-        if self.is_recording: 
+        if self.is_recording:
             self.recorder.stop()
             self.save_logs_to_file()
-        # Ensure the process monitor thread is stopped before exiting
-        if self.process_monitor_thread:
-            self.process_monitor_thread.stop()
-            self.process_monitor_thread.wait() # Wait for it to finish            
-        for thread in self.log_reader_threads:
-            thread.stop()        
-        event.accept()    
\ No newline at end of file
+        self._proc_timer.stop()
+        self._res_timer.stop()
+        self._tail_timer.stop()
+        # Destroying a QThread while it is still running crashes; let an
+        # in-flight detection pass finish, but detach its signal first so
+        # it cannot rebuild the UI mid-teardown.
+        if self.detection_thread and self.detection_thread.isRunning():
+            self.detection_thread.devices_ready.disconnect(self.update_ui_with_devices)
+            self.detection_thread.wait()
+        event.accept()
\ No newline at end of file
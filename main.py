@@ -1,5 +1,7 @@
+import os
 import sys
 import atexit
+import signal
 import psutil
 import logging
 import traceback
@@ -31,16 +33,31 @@ def cleanup_processes():
         return
         
     logging.info(f"[ATExit Cleanup] Ensuring shutdown of {len(ALL_PIDS)} tracked PIDs.")
+    procs = []
     for pid in list(ALL_PIDS):
         try:
-            p = psutil.Process(pid)
-            logging.warning(f"[ATExit Cleanup] Found orphaned process {pid}. Terminating.")
-            p.kill()
+            procs.append(psutil.Process(pid))
         except psutil.NoSuchProcess:
             # Process already ended, which is good.
             pass
+
+    # Pass 1: one kill signal per process. Each FFmpeg runs in its own
+    # session (see Recorder._launch_process), so on POSIX killpg reaches the
+    # whole group in a single syscall.
+    for p in procs:
+        logging.warning(f"[ATExit Cleanup] Found orphaned process {p.pid}. Terminating.")
+        try:
+            if hasattr(os, 'killpg'):
+                os.killpg(p.pid, signal.SIGKILL)
+            else:
+                p.kill()
+        except (ProcessLookupError, PermissionError, psutil.NoSuchProcess):
+            pass
         except Exception as e:
-            logging.error(f"[ATExit Cleanup] Error while cleaning up PID {pid}: {e}")
+            logging.error(f"[ATExit Cleanup] Error while cleaning up PID {p.pid}: {e}")
+
+    # Pass 2: reap everything in one batch wait instead of per-PID waits.
+    psutil.wait_procs(procs, timeout=2)
 
 # Register the cleanup function to be called on exit
 atexit.register(cleanup_processes)
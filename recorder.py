@@ -1,34 +1,249 @@
 import logging
 import platform
 import os
+import time
 import datetime
 import ffmpeg
+import psutil
 import subprocess
+import threading
 import re
-import psutil
+from concurrent.futures import ThreadPoolExecutor
+
+# Module-level logger: isEnabledFor and level checks are a single
+# attribute load instead of a getLogger walk at every call site.
+logger = logging.getLogger(__name__)
+
+# Precompiled at module load so each call skips the regex-cache lookup.
+# Matches bracketed prefixes like [Input]
+_BRACKET_RE = re.compile(r'\[.*?\]\s*')
+# Maps each filename-invalid character to an underscore; str.translate runs
+# the substitution as a C-level per-character scan, far cheaper than re.sub
+# for a plain character class.
+_INVALID_TABLE = str.maketrans(dict.fromkeys('\\/*?:"<>|', '_'))
+# Names that are already clean filenames (like 'HDMI-1') skip the
+# substitution machinery entirely via this single anchored match. Edge
+# characters must be non-space so the strip() below stays a no-op.
+_SAFE_RE = re.compile(r'\A[\w.-](?:[\w. -]*[\w.-])?\Z')
 
 def sanitize_filename(name: str) -> str:
     """Removes invalid characters from a string to make it a valid filename."""
-    # Remove bracketed prefixes like [Input]
-    name = re.sub(r'\[.*?\]\s*', '', name)
-    # Replace invalid chars with an underscore
-    return re.sub(r'[\\/*?:"<>|]', "_", name).strip()
+    if _SAFE_RE.match(name):
+        return name
+    return _BRACKET_RE.sub('', name).translate(_INVALID_TABLE).strip()
 
 class Recorder:
     """
     Manages multiple, independent FFmpeg processes for failsafe recording.
     Each screen, webcam, or audio source gets its own process.
     """
-    def __init__(self, screen_tasks, webcam_tasks, audio_tasks, save_path=None):
+    def __init__(self, screen_tasks, webcam_tasks, audio_tasks, save_path=None, merge_inputs=True,
+                 preset='veryfast', mode='live'):
         self.screen_tasks = screen_tasks
         self.webcam_tasks = webcam_tasks
         self.audio_tasks = audio_tasks
         self.save_path = save_path
-        
+        # When True, screen tasks sharing a display backend are fused into
+        # one FFmpeg process (cheaper); False keeps one process per task so
+        # a crash in one recording cannot take down another.
+        self.merge_inputs = merge_inputs
+        # x264 speed/quality preset for software-encoded video outputs.
+        self.preset = preset
+        # 'live' encodes H.264 during capture. 'record_then_transcode'
+        # captures lossless ffvhuff (I/O-bound, almost no CPU) and
+        # re-encodes in the background after stop() — useful when live
+        # encoding would drop frames on a CPU-constrained host.
+        self.mode = mode
+        self._video_ext = '.mkv' if mode == 'record_then_transcode' else '.mp4'
+        self._transcode_queue = [] # Lossless capture files awaiting re-encode
+
         self.processes = [] # Now stores tuples of (process, task_name)
+        self._subtasks = {} # Maps a fused task_name to its constituent task names
+        self._log_files = [] # Tuples of (path, file handle) for per-task logs
+        self._launch_lock = threading.Lock() # Guards the two lists above
+        self._next_core = 0 # Round-robin cursor for encoder core assignment
         self.system = platform.system()
         
         self.project_dir = self._create_project_directory()
+        self._h264_encoder = self._detect_h264_encoder()
+        self._use_ddagrab = self.system == "Windows" and self._detect_ddagrab()
+        # Zero-copy Linux capture: kmsgrab hands the framebuffer to the
+        # VAAPI encoder as a DMA-BUF handle, no host-visible copy per
+        # frame. It needs CAP_SYS_ADMIN on the ffmpeg binary and captures
+        # whole planes only, so it is opt-in and fullscreen-only.
+        self._use_kmsgrab = (self.system == "Linux" and self.mode == 'live'
+                             and self._h264_encoder == 'h264_vaapi'
+                             and os.environ.get('MULTIREC_KMSGRAB') == '1')
+        self._mjpeg_decoder = self._detect_mjpeg_decoder() if self.system == "Linux" else None
+        self._per_task_threads = self._compute_task_threads(
+            len(self.screen_tasks) + len(self.webcam_tasks))
+
+        # Resolve the per-platform input builders once instead of walking an
+        # if/elif chain for every task at start time.
+        builders = {
+            'Windows': (self._screen_input_gdi, self._webcam_input_dshow, self._audio_input_dshow),
+            'Linux': (self._screen_input_x11, self._webcam_input_v4l2, self._audio_input_pulse),
+            'Darwin': (self._screen_input_avf, self._webcam_input_avf, self._audio_input_avf),
+        }
+        self._screen_builder, self._webcam_builder, self._audio_builder = (
+            builders.get(self.system, (None, None, None)))
+
+    def _detect_mjpeg_decoder(self):
+        """
+        Returns a hardware MJPEG decoder matching the selected encoder's
+        GPU, or None for software decode. Only consulted for webcams.
+        """
+        preferred = {'h264_nvenc': 'mjpeg_cuvid', 'h264_qsv': 'mjpeg_qsv'}.get(self._h264_encoder)
+        if preferred is None:
+            return None
+        try:
+            result = subprocess.run(
+                ['ffmpeg', '-hide_banner', '-decoders'],
+                capture_output=True, text=True, timeout=10
+            )
+            if preferred in result.stdout:
+                logger.info(f"Using hardware MJPEG decoder: {preferred}")
+                return preferred
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"Could not probe FFmpeg decoders: {e}.")
+        return None
+
+    def _compute_task_threads(self, video_tasks) -> int:
+        """
+        Picks an explicit encoder thread count per video task. libx264
+        defaults to one thread pool per process sized to the machine, so
+        several concurrent recordings oversubscribe every core; capping at
+        roughly ncpu / tasks keeps the aggregate near the core count.
+        Overridable via the MULTIREC_THREADS environment variable.
+        """
+        env = os.environ.get('MULTIREC_THREADS')
+        if env:
+            try:
+                threads = max(1, int(env))
+                logger.info("Using MULTIREC_THREADS override: %s threads per task.", threads)
+                return threads
+            except ValueError:
+                logger.warning(f"Ignoring non-numeric MULTIREC_THREADS value: {env!r}")
+        threads = max(2, (os.cpu_count() or 2) // max(1, video_tasks))
+        logger.info("Using %s encoder threads per video task.", threads)
+        return threads
+
+    def _detect_ddagrab(self) -> bool:
+        """
+        Checks whether this FFmpeg build ships the ddagrab filter (DXGI
+        Desktop Duplication). It captures from the GPU compositor, so it
+        handles DirectX/UWP content and high framerates that the GDI
+        BitBlt path of gdigrab cannot.
+        """
+        try:
+            result = subprocess.run(
+                ['ffmpeg', '-hide_banner', '-filters'],
+                capture_output=True, text=True, timeout=10
+            )
+            return 'ddagrab' in result.stdout
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"Could not probe FFmpeg filters: {e}. Using gdigrab.")
+            return False
+
+    def _detect_h264_encoder(self) -> str:
+        """
+        Probes FFmpeg once for an available H.264 hardware encoder. Hardware
+        encoding runs on fixed-function silicon, so it leaves the CPU free
+        for whatever is being recorded; libx264 on a large desktop capture
+        can saturate several cores. Falls back to libx264.
+        """
+        try:
+            result = subprocess.run(
+                ['ffmpeg', '-hide_banner', '-encoders'],
+                capture_output=True, text=True, timeout=10
+            )
+            available = result.stdout
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"Could not probe FFmpeg encoders: {e}. Using libx264.")
+            return 'libx264'
+
+        # Ordered by preference per platform. VideoToolbox is the only
+        # hardware path on macOS; elsewhere NVIDIA, Intel, then the
+        # platform's remaining path (AMF on Windows, VAAPI on Linux).
+        if self.system == "Darwin":
+            candidates = ['h264_videotoolbox']
+        elif self.system == "Windows":
+            candidates = ['h264_nvenc', 'h264_qsv', 'h264_amf']
+        else:
+            candidates = ['h264_nvenc', 'h264_qsv']
+            # VAAPI needs a render node to talk to.
+            if os.path.exists(self.VAAPI_DEVICE):
+                candidates.append('h264_vaapi')
+
+        for encoder in candidates:
+            if encoder in available:
+                logger.info(f"Using hardware H.264 encoder: {encoder}")
+                return encoder
+        logger.info("No hardware H.264 encoder found. Using libx264.")
+        return 'libx264'
+
+    # The default DRM render node VAAPI encodes through on Linux.
+    VAAPI_DEVICE = '/dev/dri/renderD128'
+
+    def _video_output_kwargs(self) -> dict:
+        """Returns the encoder keyword arguments for video capture outputs."""
+        if self.mode == 'record_then_transcode':
+            # Lossless intra-only capture: trades disk bandwidth for CPU
+            # headroom while recording. Re-encoded after the session ends.
+            return {'vcodec': 'ffvhuff', 'pix_fmt': 'yuv420p', 'r': 30,
+                    'fflags': '+flush_packets'}
+        kwargs = self._h264_output_kwargs()
+        # Hand each packet to the OS as soon as it is muxed. Steady small
+        # writes keep the page cache from accumulating large dirty bursts
+        # that several concurrent recordings would flush at once, and less
+        # buffered data is lost if the process dies.
+        kwargs['fflags'] = '+flush_packets'
+        # Fragmented MP4 makes the capture append-only: a plain MP4 writes
+        # its moov index at stop time (a seek-back rewrite that grows with
+        # recording length) and loses the whole file on a crash. Fragments
+        # cost a little container overhead and make stop O(1). Transcoded
+        # files skip this — they are written offline and can't be cut short.
+        kwargs['movflags'] = '+frag_keyframe+empty_moov+default_base_moof'
+        # A keyframe every 2 seconds regardless of scene cuts, so each
+        # fragment is independently decodable: a crash loses at most the
+        # current 2-second slice instead of a whole scenecut-driven GOP.
+        kwargs.update(g=60, force_key_frames='expr:gte(t,n_forced*2)')
+        return kwargs
+
+    def _h264_output_kwargs(self) -> dict:
+        """Returns the H.264 encoder keyword arguments for final outputs."""
+        if self._h264_encoder == 'h264_vaapi':
+            # VAAPI encodes GPU surfaces; the input side is responsible for
+            # getting frames onto them (hwupload or a hardware grabber).
+            return {'vcodec': 'h264_vaapi', 'r': 30}
+        kwargs = {'vcodec': self._h264_encoder, 'pix_fmt': 'yuv420p', 'r': 30}
+        if self._h264_encoder == 'h264_nvenc':
+            # p4 balances speed and quality; VBR with a constant-quality
+            # target keeps bitrate sane on mostly-static desktop content.
+            kwargs.update(preset='p4', rc='vbr', cq=23)
+        elif self._h264_encoder == 'libx264':
+            # Only the software encoder spins up a CPU thread pool worth
+            # capping; hardware encoders barely touch the CPU. x264's
+            # default 'medium' preset is tuned for offline transcoding;
+            # zerolatency drops the B-frame lookahead buffers that a live
+            # capture never benefits from, cutting CPU and RSS per frame.
+            kwargs.update(threads=self._per_task_threads, preset=self.preset,
+                          tune='zerolatency')
+        return kwargs
+
+    def _audio_output_kwargs(self) -> dict:
+        """Returns the encoder keyword arguments for audio outputs."""
+        # FFmpeg's native AAC encoder is SIMD-optimized and roughly half the
+        # CPU of scalar libmp3lame at better quality per bit. On macOS,
+        # AudioToolbox offloads the encode to the OS entirely.
+        codec = 'aac_at' if self.system == "Darwin" else 'aac'
+        return {'acodec': codec, 'audio_bitrate': '192k'}
+
+    def _finalize_video_output(self, output):
+        """Applies encoder-specific global arguments to a video output stream."""
+        if self.mode != 'record_then_transcode' and self._h264_encoder == 'h264_vaapi':
+            output = output.global_args('-vaapi_device', self.VAAPI_DEVICE)
+        return output
 
     def _create_project_directory(self) -> str:
         base_path = self.save_path or os.path.join(os.path.expanduser('~'), 'Videos')
@@ -36,104 +251,315 @@ class Recorder:
         project_path = os.path.join(base_path, f"Multi_Recorder_{timestamp}")
         try:
             os.makedirs(project_path, exist_ok=True)
-            logging.info(f"Created project directory: {project_path}")
+            logger.info(f"Created project directory: {project_path}")
             return project_path
         except OSError as e:
-            logging.error(f"Failed to create project directory: {e}")
+            logger.error(f"Failed to create project directory: {e}")
             return base_path
 
     def start(self):
-        """Launches one FFmpeg process for each recording task."""
-        # --- Launch Screen Recording Processes ---
-        for task in self.screen_tasks:
+        """
+        Launches one FFmpeg process for each recording task. All tasks spawn
+        concurrently: fork+exec costs tens of ms per child (more on Windows)
+        and releases the GIL, so parallel launches cut start latency to
+        roughly the slowest single spawn and keep the recordings' start
+        times closely aligned.
+        """
+        if self.merge_inputs and len(self.screen_tasks) > 1 and self.system in ("Linux", "Windows"):
+            # Multiple captures of the same display share a backend, so one
+            # FFmpeg with several inputs and outputs handles them all: one
+            # event loop, one set of codec contexts, no duplicated reads.
+            screen_jobs = [('screens_fused', self.screen_tasks)]
+        else:
+            screen_jobs = [('screen', task) for task in self.screen_tasks]
+        all_tasks = (screen_jobs
+                     + [('webcam', task) for task in self.webcam_tasks]
+                     + [('audio', task) for task in self.audio_tasks])
+        if not all_tasks:
+            return
+        with ThreadPoolExecutor(max_workers=len(all_tasks)) as executor:
+            list(executor.map(self._launch_one, all_tasks))
+
+    def _launch_one(self, tagged_task):
+        """Builds and launches the FFmpeg process for a single tagged task."""
+        kind, task = tagged_task
+        if kind == 'screen':
             try:
                 stream = self._get_screen_input(task)
-                filename = os.path.join(self.project_dir, f"{sanitize_filename(task['monitor'].name)}.mp4")
-                output = ffmpeg.output(stream, filename, vcodec='libx264', pix_fmt='yuv420p', r=30)
-                self._launch_process(output, f"Screen {task['monitor'].id}")
+                filename = os.path.join(self.project_dir, f"{sanitize_filename(task['monitor'].name)}{self._video_ext}")
+                output = ffmpeg.output(stream, filename, **self._video_output_kwargs())
+                self._launch_process(self._finalize_video_output(output), f"Screen {task['monitor'].id}")
             except Exception as e:
-                logging.error(f"Failed to start recording for Screen {task['monitor'].id}: {e}")
-
-        # --- Launch Webcam Recording Processes ---
-        for task in self.webcam_tasks:
+                logger.error(f"Failed to start recording for Screen {task['monitor'].id}: {e}")
+        elif kind == 'screens_fused':
+            try:
+                outputs = []
+                for screen_task in task:
+                    stream = self._get_screen_input(screen_task)
+                    if isinstance(stream.node, ffmpeg.nodes.InputNode):
+                        # ffmpeg-python omits -map for a bare first input, and
+                        # FFmpeg's default selection then picks the highest-
+                        # resolution video across *all* inputs. Selecting the
+                        # video stream compiles to an explicit '-map N:v' so
+                        # every output records its own monitor. Filtered
+                        # streams (VAAPI upload, kmsgrab) are already mapped
+                        # by their filter-graph label.
+                        stream = stream['v']
+                    filename = os.path.join(self.project_dir, f"{sanitize_filename(screen_task['monitor'].name)}{self._video_ext}")
+                    outputs.append(ffmpeg.output(stream, filename, **self._video_output_kwargs()))
+                ids = '+'.join(str(screen_task['monitor'].id) for screen_task in task)
+                merged = self._finalize_video_output(ffmpeg.merge_outputs(*outputs))
+                self._launch_process(merged, f"Screens {ids}",
+                                     subtasks=[f"Screen {t['monitor'].id}" for t in task])
+            except Exception as e:
+                # Fall back to the failsafe one-process-per-screen path.
+                logger.error(f"Fused screen recording failed to start ({e}). Falling back to one process per screen.")
+                for screen_task in task:
+                    self._launch_one(('screen', screen_task))
+        elif kind == 'webcam':
             try:
                 stream = self._get_webcam_input(task)
-                filename = os.path.join(self.project_dir, f"{sanitize_filename(task.name)}.mp4")
-                output = ffmpeg.output(stream, filename, vcodec='libx264', pix_fmt='yuv420p', r=30)
-                self._launch_process(output, f"Webcam {task.name}")
+                filename = os.path.join(self.project_dir, f"{sanitize_filename(task.name)}{self._video_ext}")
+                output = ffmpeg.output(stream, filename, **self._video_output_kwargs())
+                self._launch_process(self._finalize_video_output(output), f"Webcam {task.name}")
             except Exception as e:
-                logging.error(f"Failed to start recording for Webcam {task.name}: {e}")
-        
-        # --- Launch Audio Recording Processes ---
-        for task in self.audio_tasks:
+                logger.error(f"Failed to start recording for Webcam {task.name}: {e}")
+        elif kind == 'audio':
             try:
                 stream = self._get_audio_input(task)
-                filename = os.path.join(self.project_dir, f"{sanitize_filename(task.name)}.mp3")
-                output = ffmpeg.output(stream, filename, acodec='libmp3lame', audio_bitrate='192k')
-                self._launch_process(output, f"Audio {task.name}")
+                filename = os.path.join(self.project_dir, f"{sanitize_filename(task.name)}.m4a")
+                output = ffmpeg.output(stream, filename, **self._audio_output_kwargs())
+                self._launch_process(output, f"Audio {task.name}", is_video=False)
             except Exception as e:
-                logging.error(f"Failed to start recording for Audio {task.name}: {e}")
+                logger.error(f"Failed to start recording for Audio {task.name}: {e}")
 
-    def _launch_process(self, stream, task_name):
-        """Compiles and runs a single FFmpeg command, capturing its output."""
+    def _launch_process(self, stream, task_name, subtasks=None, is_video=True):
+        """Compiles and runs a single FFmpeg command, logging output to a file."""
+        # Warnings and the one-line progress counter are all the log file
+        # needs; FFmpeg's default INFO output writes per-frame chatter.
+        stream = stream.global_args('-loglevel', 'warning', '-stats')
         args = ffmpeg.compile(stream, overwrite_output=True)
-        logging.info(f"Starting process for {task_name}: ffmpeg {' '.join(args)}")
-        
-        process = subprocess.Popen(
-            args, # Use the args list directly
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-        self.processes.append((process, task_name))
-        logging.info(f"Process for {task_name} started with PID: {process.pid}")
+        logger.info("Starting process for %s", task_name)
+        # Joining the argv list is only worth doing when someone will see it.
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Command for %s: ffmpeg %s", task_name, ' '.join(args))
+
+        # FFmpeg writes progress to stderr for every frame. With a PIPE that
+        # nobody drains fast enough, the 64 KB buffer eventually fills and
+        # FFmpeg blocks on the write — silently stalling the recording. A
+        # per-task log file has no such limit and doubles as a diagnostic.
+        log_path = os.path.join(self.project_dir, f"{sanitize_filename(task_name)}.log")
+        log_file = open(log_path, 'wb', buffering=0)
+        # Each FFmpeg gets its own process group (session on Unix) so the
+        # atexit cleanup can kill a whole group with one signal, including
+        # any children FFmpeg itself may spawn.
+        if self.system == "Windows":
+            group_kwargs = {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            group_kwargs = {'start_new_session': True}
+        try:
+            process = subprocess.Popen(
+                args, # Use the args list directly
+                stdin=subprocess.PIPE, # Kept open so stop() can send the 'q' quit key
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+                close_fds=True, # Children must not inherit sockets or other log handles
+                **group_kwargs
+            )
+        except Exception:
+            # The handle is only tracked in _log_files after a successful
+            # spawn; close it here so a failed launch does not leak it.
+            log_file.close()
+            raise
+        with self._launch_lock:
+            self.processes.append((process, task_name))
+            if subtasks:
+                self._subtasks[task_name] = subtasks
+            self._log_files.append((log_path, log_file))
+            if self.mode == 'record_then_transcode':
+                # Every lossless video output of this command gets
+                # re-encoded once the session ends.
+                self._transcode_queue.extend(
+                    arg for arg in args if arg.endswith(self._video_ext))
+        self._apply_process_tuning(process, is_video, len(subtasks) if subtasks else 1)
+        logger.info("Process for %s started with PID: %s", task_name, process.pid)
+
+    def _apply_process_tuning(self, process, is_video, n_encoders=1):
+        """
+        Best-effort scheduling tuning for a capture process: grabbers are
+        latency-sensitive, so any scheduler delay drops frames. Every step
+        is optional — permission failures are expected for unprivileged
+        runs and simply leave the default behaviour in place.
+        """
+        try:
+            proc = psutil.Process(process.pid)
+        except psutil.NoSuchProcess:
+            return # Already exited (bad arguments, missing device, ...)
+
+        try:
+            proc.nice(psutil.HIGH_PRIORITY_CLASS if self.system == "Windows" else -5)
+        except (psutil.AccessDenied, psutil.NoSuchProcess, OSError):
+            pass # Raising priority needs privileges on Unix
+
+        if self.system == "Linux":
+            try:
+                proc.ionice(psutil.IOPRIO_CLASS_RT, value=4)
+            except (psutil.AccessDenied, psutil.NoSuchProcess, OSError):
+                pass # Realtime I/O class needs CAP_SYS_ADMIN
+
+        # Pin each software video encoder to its own block of cores so the
+        # encoders spread out instead of colliding on the same ones. Only
+        # worthwhile for libx264 with several video tasks; hardware
+        # encoders barely touch the CPU.
+        if not is_video or self._h264_encoder != 'libx264':
+            return
+        if len(self.screen_tasks) + len(self.webcam_tasks) < 2:
+            return
+        ncpu = os.cpu_count() or 1
+        # A fused process runs one encoder per output, so it needs that
+        # many per-task blocks; pinning it to a single block would leave
+        # the other cores idle while its threads fight over one block.
+        span = min(self._per_task_threads * n_encoders, ncpu)
+        if span >= ncpu:
+            return # The pin would cover every core — nothing to isolate
+        with self._launch_lock:
+            start = self._next_core
+            self._next_core = (self._next_core + span) % ncpu
+        try:
+            proc.cpu_affinity([(start + i) % ncpu for i in range(span)])
+        except (AttributeError, psutil.AccessDenied, psutil.NoSuchProcess, OSError):
+            pass # Not supported on this platform (e.g. macOS)
 
     def get_active_processes(self):
         """Returns the list of currently running subprocess objects."""
         return self.processes
 
+    def get_log_paths(self):
+        """Returns the paths of the per-task FFmpeg log files."""
+        return [path for path, _log_file in self._log_files]
+
+    def get_subtask_names(self, task_name):
+        """
+        Returns the constituent task names behind a process's task_name.
+        A fused process covers several tasks; a plain one covers itself.
+        """
+        return self._subtasks.get(task_name, [task_name])
+
     def stop(self):
         """
-        Stops all active FFmpeg recording processes gracefully and forcefully if necessary.
-        This method is now much more robust against crashes.
+        Stops all active FFmpeg recording processes gracefully and forcefully
+        if necessary. Quit requests go out to every process before any wait
+        starts, so total shutdown time is bounded by the slowest process
+        instead of the sum of all of them.
         """
-        logging.info(f"Initiating shutdown for {len(self.processes)} processes.")
+        logger.info(f"Initiating shutdown for {len(self.processes)} processes.")
+        # Pass 1: ask each FFmpeg to quit. 'q' on stdin is FFmpeg's graceful
+        # shutdown path, which flushes the muxer and finalizes the file.
         for process, task_name in self.processes:
-            # First, check if the process is still running using psutil
             try:
-                p = psutil.Process(process.pid)
-                if p.is_running():
-                    logging.info(f"Stopping process for '{task_name}' (PID: {process.pid})...")
-                    # Try to terminate gracefully first
-                    p.terminate()
-                    try:
-                        # Wait for a short period for the process to die
-                        p.wait(timeout=3)
-                        logging.info(f"Process for '{task_name}' terminated gracefully.")
-                    except psutil.TimeoutExpired:
-                        # If it doesn't die, kill it forcefully
-                        logging.warning(f"Process for '{task_name}' did not terminate gracefully. Killing forcefully.")
-                        p.kill()
-                        p.wait() # Ensure it's dead
+                if process.stdin:
+                    process.stdin.write(b'q')
+                    process.stdin.flush()
+                    # EOF on stdin doubles as a quit request for builds that
+                    # ignore interactive keys, and releases the pipe buffer.
+                    process.stdin.close()
+            except (OSError, ValueError):
+                pass # Process already exited or its stdin is closed
+
+        # Pass 2: one reaper loop polls every process against a global
+        # deadline. poll() is a single cheap syscall per process, and the
+        # deadlines apply to the whole set rather than per process, so
+        # shutdown is bounded at ~7 s no matter how many tasks are stuck.
+        # (os.waitid(P_ALL) would be fewer syscalls still, but it races
+        # Popen's own reaping and breaks its returncode tracking.)
+        pending = self._reap_until(list(self.processes), timeout=5,
+                                   success_msg="Process for '%s' terminated gracefully.")
+        if pending:
+            # One more chance to flush the muxer: SIGTERM still lets FFmpeg
+            # finalize the file, unlike SIGKILL which risks a broken index.
+            for process, task_name in pending:
+                logger.warning("Process for '%s' did not quit in time. Terminating.", task_name)
+                process.terminate()
+            pending = self._reap_until(pending, timeout=2,
+                                       success_msg="Process for '%s' terminated after SIGTERM.")
+        for process, task_name in pending:
+            logger.warning("Process for '%s' ignored SIGTERM. Killing forcefully.", task_name)
+            process.kill()
+            process.wait() # Ensure it's dead
+
+        for _path, log_file in self._log_files:
+            try:
+                log_file.close()
+            except OSError:
+                pass
+
+        self.processes = []
+        logger.info("All recording processes have been handled.")
+
+        if self.mode == 'record_then_transcode' and self._transcode_queue:
+            thread = threading.Thread(target=self._transcode_recordings,
+                                      name='transcode', daemon=True)
+            thread.start()
+
+    def _reap_until(self, pending, timeout, success_msg):
+        """Polls processes until all exit or timeout passes; returns survivors."""
+        deadline = time.monotonic() + timeout
+        while pending:
+            still_running = []
+            for process, task_name in pending:
+                if process.poll() is None:
+                    still_running.append((process, task_name))
+                else:
+                    # A fused process covers several tasks; report each one.
+                    for name in self._subtasks.get(task_name, (task_name,)):
+                        logger.info(success_msg, name)
+            pending = still_running
+            if not pending or time.monotonic() >= deadline:
+                break
+            time.sleep(0.05)
+        return pending
+
+    def _transcode_recordings(self):
+        """Re-encodes lossless captures to H.264 at low priority, one at a time."""
+        logger.info("Transcoding %s lossless capture(s) in the background.",
+                    len(self._transcode_queue))
+        # The transcoders must not compete with whatever the user does next.
+        if self.system == "Windows":
+            priority_kwargs = {'creationflags': subprocess.IDLE_PRIORITY_CLASS}
+        else:
+            priority_kwargs = {'preexec_fn': lambda: os.nice(19)}
+
+        for mkv_path in self._transcode_queue:
+            mp4_path = os.path.splitext(mkv_path)[0] + '.mp4'
+            stream = ffmpeg.input(mkv_path)
+            if self._h264_encoder == 'h264_vaapi':
+                stream = stream.filter('format', 'nv12').filter('hwupload')
+            output = ffmpeg.output(stream, mp4_path, **self._h264_output_kwargs())
+            if self._h264_encoder == 'h264_vaapi':
+                output = output.global_args('-vaapi_device', self.VAAPI_DEVICE)
+            args = ffmpeg.compile(output.global_args('-loglevel', 'warning'),
+                                  overwrite_output=True)
+            try:
+                result = subprocess.run(args, stdin=subprocess.DEVNULL,
+                                        capture_output=True, **priority_kwargs)
+                if result.returncode == 0:
+                    os.remove(mkv_path)
+                    logger.info("Transcoded %s", mp4_path)
                 else:
-                    logging.info(f"Process for '{task_name}' (PID: {process.pid}) was already stopped.")
-            except psutil.NoSuchProcess:
-                # This is a safe condition, means the process is already gone.
-                logging.warning(f"Process for '{task_name}' (PID: {process.pid}) no longer exists.")
+                    logger.error("Transcode of %s failed: %s", mkv_path,
+                                 result.stderr.decode(errors='replace').strip())
             except Exception as e:
-                # Catch any other potential errors during shutdown
-                logging.error(f"An unexpected error occurred while stopping process for '{task_name}': {e}")
-        
-        self.processes = []
-        logging.info("All recording processes have been handled.")
+                logger.error("Transcode of %s failed: %s", mkv_path, e)
+        logger.info("Background transcoding finished.")
 
     def _get_screen_input(self, task):
         """
         Constructs and returns the correct FFmpeg input stream for screen capture.
         """
+        if self._screen_builder is None:
+            raise OSError(f"Unsupported OS for screen capture: {self.system}")
         monitor = task['monitor']
         mode = task['mode']
-        x, y, w, h = 0, 0, 0, 0
 
         if mode == 'fullscreen':
             x, y = monitor.position
@@ -143,52 +569,89 @@ class Recorder:
         else:
             raise ValueError(f"Invalid screen capture mode: {mode}")
 
-        input_options = {'s': f'{w}x{h}', 'framerate': 30, 'draw_mouse': '1'}
-        
-        if self.system == "Windows":
-            return ffmpeg.input('desktop', f='gdigrab', offset_x=x, offset_y=y, **input_options)
-        elif self.system == "Linux":
-            display = os.environ.get('DISPLAY', ':0.0')
-            return ffmpeg.input(f'{display}+{x},{y}', f='x11grab', **input_options)
-        elif self.system == "Darwin":
-            # On macOS, the monitor ID from screeninfo corresponds to the device index
-            # for avfoundation. We capture video only ('none' for audio).
-            return ffmpeg.input(f'{monitor.id}:none', f='avfoundation', **input_options)
-        
-        raise OSError(f"Unsupported OS for screen capture: {self.system}")
+        return self._screen_builder(monitor, x, y, w, h)
+
+    def _screen_input_gdi(self, monitor, x, y, w, h):
+        if self._use_ddagrab:
+            # Desktop Duplication captures on the GPU compositor.
+            # hwdownload brings frames back to system memory so the
+            # graph works with any encoder, hardware or software.
+            graph = (f'ddagrab=offset_x={x}:offset_y={y}:video_size={w}x{h}:framerate=30,'
+                     'hwdownload,format=bgra')
+            return ffmpeg.input(graph, f='lavfi')
+        return ffmpeg.input('desktop', f='gdigrab', offset_x=x, offset_y=y,
+                            s=f'{w}x{h}', framerate=30, draw_mouse='1')
+
+    def _screen_input_x11(self, monitor, x, y, w, h):
+        if self._use_kmsgrab and (x, y) == tuple(monitor.position) and (w, h) == tuple(monitor.resolution):
+            # DMA-BUF all the way: map the grabbed framebuffer onto the
+            # VAAPI device and convert on the GPU.
+            stream = ffmpeg.input('-', f='kmsgrab', framerate=30)
+            return stream.filter('hwmap', derive_device='vaapi').filter('scale_vaapi', format='nv12')
+        display = os.environ.get('DISPLAY', ':0.0')
+        stream = ffmpeg.input(f'{display}+{x},{y}', f='x11grab',
+                              s=f'{w}x{h}', framerate=30, draw_mouse='1')
+        return self._vaapi_upload(stream)
+
+    def _vaapi_upload(self, stream):
+        """Uploads software frames to VAAPI surfaces when that encoder is active."""
+        if self.mode == 'live' and self._h264_encoder == 'h264_vaapi':
+            return stream.filter('format', 'nv12').filter('hwupload')
+        return stream
+
+    def _screen_input_avf(self, monitor, x, y, w, h):
+        # On macOS, the monitor ID from screeninfo corresponds to the device index
+        # for avfoundation. We capture video only ('none' for audio).
+        return ffmpeg.input(f'{monitor.id}:none', f='avfoundation',
+                            s=f'{w}x{h}', framerate=30, draw_mouse='1')
 
     def _get_webcam_input(self, cam_device):
         """
         Constructs and returns the FFmpeg input stream for a webcam.
         """
-        if self.system == "Windows":
-            # On Windows, OpenCV device indices usually match dshow device names.
-            # A more robust solution might require mapping, but this is a strong default.
-            return ffmpeg.input(f'video=Webcam {cam_device.id}', f='dshow', framerate=30)
-        elif self.system == "Linux":
-            # The more specific command for V4L2 devices often prevents errors.
-            return ffmpeg.input(f'/dev/video{cam_device.id}', format='v4l2', input_format='yuyv422', framerate=30)
-        elif self.system == "Darwin":
-            # On macOS, the webcam index is used with avfoundation.
-            return ffmpeg.input(f'{cam_device.id}:none', f='avfoundation', framerate=30)
-        
-        raise OSError(f"Unsupported OS for webcam capture: {self.system}")
+        if self._webcam_builder is None:
+            raise OSError(f"Unsupported OS for webcam capture: {self.system}")
+        return self._webcam_builder(cam_device)
+
+    def _webcam_input_dshow(self, cam_device):
+        # On Windows, OpenCV device indices usually match dshow device names.
+        # A more robust solution might require mapping, but this is a strong
+        # default. MJPEG keeps 1080p30 within USB bandwidth.
+        return ffmpeg.input(f'video=Webcam {cam_device.id}', f='dshow', framerate=30, vcodec='mjpeg')
+
+    def _webcam_input_v4l2(self, cam_device):
+        # Ask the camera for MJPEG rather than raw yuyv422: uncompressed
+        # 1080p saturates the USB link and caps many webcams at 5-10 fps,
+        # while MJPEG sustains 30 fps over the same wire.
+        kwargs = {'format': 'v4l2', 'input_format': 'mjpeg', 'framerate': 30}
+        if self._mjpeg_decoder:
+            kwargs['vcodec'] = self._mjpeg_decoder # Decode on the GPU
+        stream = ffmpeg.input(f'/dev/video{cam_device.id}', **kwargs)
+        return self._vaapi_upload(stream)
+
+    def _webcam_input_avf(self, cam_device):
+        # On macOS, the webcam index is used with avfoundation.
+        return ffmpeg.input(f'{cam_device.id}:none', f='avfoundation', framerate=30)
 
     def _get_audio_input(self, audio_device):
         """
         Constructs and returns the FFmpeg input stream for an audio device.
         """
-        if self.system == "Windows":
-            # Use the full device name as the identifier for dshow
-            device_name = audio_device.name.replace("[Output] ", "").replace("[Input] ", "")
-            return ffmpeg.input(f'audio={device_name}', f='dshow', ac=2)
-        elif self.system == "Linux":
-            # The full device ID from soundcard is what PulseAudio needs
-            return ffmpeg.input(audio_device.id, f='pulse', ac=2)
-        elif self.system == "Darwin":
-            # On macOS, avfoundation uses 'none:index' for audio-only devices
-            # where the index is from soundcard.
-            # NOTE: This assumes soundcard indices align with avfoundation indices.
-            return ffmpeg.input(f'none:{audio_device.id}', f='avfoundation', ac=2)
-            
-        raise OSError(f"Unsupported OS for audio capture: {self.system}")
\ No newline at end of file
+        if self._audio_builder is None:
+            raise OSError(f"Unsupported OS for audio capture: {self.system}")
+        return self._audio_builder(audio_device)
+
+    def _audio_input_dshow(self, audio_device):
+        # Use the full device name as the identifier for dshow
+        device_name = audio_device.name.replace("[Output] ", "").replace("[Input] ", "")
+        return ffmpeg.input(f'audio={device_name}', f='dshow', ac=2)
+
+    def _audio_input_pulse(self, audio_device):
+        # The full device ID from soundcard is what PulseAudio needs
+        return ffmpeg.input(audio_device.id, f='pulse', ac=2)
+
+    def _audio_input_avf(self, audio_device):
+        # On macOS, avfoundation uses 'none:index' for audio-only devices
+        # where the index is from soundcard.
+        # NOTE: This assumes soundcard indices align with avfoundation indices.
+        return ffmpeg.input(f'none:{audio_device.id}', f='avfoundation', ac=2)
\ No newline at end of file